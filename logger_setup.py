@@ -1,5 +1,9 @@
 # logger_setup.py
+import atexit
 import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
 
 def setup_logging(log_file='db//activity.log'):
     """
@@ -13,15 +17,28 @@ def setup_logging(log_file='db//activity.log'):
 
     This function configures the logging module to save log messages to a file. The log messages will be appended to the file if it already exists. The log messages will be formatted with the timestamp, log level, and the message. Only log messages with a level of INFO or higher will be saved.
 
+    Logging calls only put the record on a queue; a background QueueListener thread writes it to the file and to the console (stdout, which is what `docker-compose logs` shows), so callers never block on disk or terminal I/O. The listener is stopped (and the queue flushed) at exit. Calling this function again once logging is configured does nothing.
+
     Example usage:
         setup_logging('my_log.log')
     """
-    logging.basicConfig(
-        filename=log_file,
-        filemode='a',  # Append to the log file
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        level=logging.INFO  # Log INFO and higher-level messages
-    )
+    root_logger = logging.getLogger()
+    if root_logger.handlers:
+        return  # Already configured, same as logging.basicConfig
+
+    file_handler = logging.FileHandler(log_file, mode='a')  # Append to the log file
+    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(logging.Formatter('%(message)s'))  # Same output as print(message)
+
+    log_queue = queue.Queue(-1)  # Unbounded, enqueuing never blocks
+    listener = QueueListener(log_queue, file_handler, console_handler)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root_logger.addHandler(QueueHandler(log_queue))
+    root_logger.setLevel(logging.INFO)  # Log INFO and higher-level messages
 
 # Function to log and print messages (reuse this in your other scripts)
 def log_and_print(message, level='info'):
@@ -35,13 +52,12 @@ def log_and_print(message, level='info'):
     Returns:
         None
 
-    This function logs a message with the specified log level and also prints it to the console. The log levels available are 'info' and 'error'.
+    This function logs a message with the specified log level and also prints it to the console. The log levels available are 'info' and 'error'. The printing is done by the console handler of the background listener set up by `setup_logging`, not by the caller.
 
     Example usage:
         log_and_print('This is an info message', 'info')
         log_and_print('This is an error message', 'error')
     """
-    print(message)
     if level == 'info':
         logging.info(message)
     elif level == 'error':
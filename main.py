@@ -1,22 +1,52 @@
-import requests
+import aiohttp
+import asyncio
+import orjson
+import atexit
+import email.utils
+import logging
 import os
+import random
+import sqlite3
+import statistics
+import threading
 import time
 import sys
-from datetime import datetime
-from sqlalchemy import create_engine, MetaData, Table, select, Column, Integer, String, Float, inspect
+from sqlalchemy import create_engine, event, MetaData, Table, select, func, bindparam, Column, Index, Integer, String, Float
+from sqlalchemy.schema import CreateIndex, CreateTable
 from logger_setup import setup_logging, log_and_print
 
 # Set up logging
 setup_logging()
+logger = logging.getLogger(__name__)
 
-# Check if the database exists
+# Database location
 db_path = os.path.join('db', 'reddit_tracker.db')
 
-log_and_print(f"Checking if database '{db_path}' exists...")
-db_exists = os.path.exists(db_path)
+log_and_print(f"Using database '{db_path}'...")
 
 # Database setup
-engine = create_engine(f'sqlite:///{db_path}')
+engine = create_engine(f'sqlite:///{db_path}', query_cache_size=1200)  # Compiled statement cache
+
+# SQLite journal mode, WAL by default. WAL lets readers run alongside the writer and, together with
+# synchronous=NORMAL, needs a single fsync per commit, but it relies on shared memory (the -shm file)
+# and does not work when the database sits on a network or shared filesystem, such as the host bind
+# mount written by several containers in docker-compose.yml. Set SQLITE_JOURNAL_MODE=DELETE there
+JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL').upper()
+if JOURNAL_MODE not in ('WAL', 'DELETE', 'TRUNCATE', 'PERSIST'):
+    log_and_print(f"Unsupported SQLITE_JOURNAL_MODE '{JOURNAL_MODE}', using DELETE",'error')
+    JOURNAL_MODE = 'DELETE'
+
+# Tune SQLite on every new connection
+@event.listens_for(engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={JOURNAL_MODE}")
+    # NORMAL is only safe against corruption on power loss in WAL mode; rollback journals need FULL
+    cursor.execute("PRAGMA synchronous=NORMAL" if JOURNAL_MODE == 'WAL' else "PRAGMA synchronous=FULL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-20000")  # ~20 MB page cache
+    cursor.close()
+
 metadata = MetaData()
 
 # Define the table schema (even if it exists, this doesn't create it yet)
@@ -30,210 +60,694 @@ posts_table = Table(
     Column('created_date', String, nullable=False)  # Readable date format
 )
 
-# If the database exists, check if the table already exists
-try:
-    if db_exists:
-        inspector = inspect(engine)
-        table_exists = inspector.has_table('posts_tracker')
-    else:
-        table_exists = False
+# Last processed timestamp of each subreddit, one row per subreddit.
+# Reading it is a primary key lookup, independent of how many posts are stored
+subreddit_state_table = Table(
+    'subreddit_state', metadata,
+    Column('subreddit', String, primary_key=True),
+    Column('last_ts', Float, nullable=False),
+    Column('last_fullname', String, nullable=True)  # Reddit fullname (t3_...) of the newest stored post
+)
 
-    # If the table doesn't exist, create it
-    if not table_exists:
-        metadata.create_all(engine)  # This will create the table if it doesn't exist
-        log_and_print("Table 'posts_tracker' created.")
-    else:
-        log_and_print("Table 'posts_tracker' already exists.")
+# Unique key of a post, so re-fetched posts are skipped by INSERT OR IGNORE.
+# Declared as a unique index (rather than a table constraint) so it can also be added to existing databases
+posts_unique_index = Index('uq_post', posts_table.c.subreddit, posts_table.c.created_utc, posts_table.c.title, unique=True)
+
+# Statements are built once at import; SQLAlchemy's compiled cache then skips recompiling them per call
+LAST_POST_STMT = (
+    select(subreddit_state_table.c.last_ts, subreddit_state_table.c.last_fullname)
+    .where(subreddit_state_table.c.subreddit == bindparam('subreddit'))
+)
+
+# Version of the schema set up below, stored in the database with PRAGMA user_version.
+# Bump it whenever the setup changes so existing databases run it (once) again
+SCHEMA_VERSION = 3
+
+# Create whatever is missing from the schema. This only runs when the database is older than
+# SCHEMA_VERSION, so a normal start costs a single PRAGMA read. IF NOT EXISTS keeps every step
+# idempotent and also adds the tables/indexes introduced after an existing database was created
+try:
+    with engine.begin() as conn:
+        schema_version = conn.exec_driver_sql("PRAGMA user_version").scalar()
+        if schema_version < SCHEMA_VERSION:
+            for table in metadata.sorted_tables:
+                conn.execute(CreateTable(table, if_not_exists=True))
+
+            # Posts stored before uq_post existed can be duplicated (the hot listing shifts between
+            # pages); keep the first copy of each so the unique index can be created
+            conn.execute(posts_table.delete().where(posts_table.c.id.not_in(
+                select(func.min(posts_table.c.id))
+                .group_by(posts_table.c.subreddit, posts_table.c.created_utc, posts_table.c.title)
+            )))
+
+            for table in metadata.sorted_tables:
+                for index in table.indexes:
+                    conn.execute(CreateIndex(index, if_not_exists=True))
+
+            # Served the MAX(created_utc) read that subreddit_state replaced; it only slowed down inserts
+            conn.exec_driver_sql("DROP INDEX IF EXISTS ix_posts_subreddit_ts")
+
+            # Seed subreddit_state from the posts already stored (only while it is still empty)
+            conn.execute(subreddit_state_table.insert().from_select(
+                ['subreddit', 'last_ts'],
+                select(posts_table.c.subreddit, func.max(posts_table.c.created_utc))
+                .where(~select(subreddit_state_table.c.subreddit).exists())
+                .group_by(posts_table.c.subreddit)
+            ))
+
+            conn.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            log_and_print(f"Database schema updated to version {SCHEMA_VERSION}.")
+    log_and_print("Database tables are ready.")
 except Exception as e:
     log_and_print(f"Error checking/creating table: {e}",'error')
 
+# SQLAlchemy is only used for the schema and reads; inserts go straight through a raw sqlite3
+# connection, skipping the per-row parameter processing of the Core layer.
+# isolation_level=None leaves transaction control to the explicit BEGIN/COMMIT in save_new_posts,
+# and writes are serialized by db_write_lock so the connection can be shared between the threads
+# that run the blocking database calls off the event loop.
+# Posts are inserted with multi-row VALUES statements, binding as many rows per statement as
+# SQLite's default limit of 999 parameters allows (5 columns -> 199 rows)
+INSERT_POST_PREFIX = "INSERT OR IGNORE INTO posts_tracker (subreddit, title, author, created_utc, created_date) VALUES "
+INSERT_POST_COLUMNS = 5
+ROWS_PER_STMT = 999 // INSERT_POST_COLUMNS
+
+# Function to build the insert statement for a number of posts
+def build_insert_sql(row_count):
+    """
+    Builds a multi-row INSERT OR IGNORE statement for posts_tracker.
+
+    Args:
+        row_count (int): The number of rows the statement inserts.
+
+    Returns:
+        str: The SQL statement, with one (?, ?, ?, ?, ?) group per row.
+    """
+    return INSERT_POST_PREFIX + ", ".join(["(?, ?, ?, ?, ?)"] * row_count)
+
+INSERT_POST_CHUNK_SQL = build_insert_sql(ROWS_PER_STMT)
+# Pages are not always in chronological order, so never move the stored newest post backwards
+UPDATE_STATE_SQL = (
+    "INSERT INTO subreddit_state (subreddit, last_ts, last_fullname) VALUES (?, ?, ?) "
+    "ON CONFLICT (subreddit) DO UPDATE SET "
+    "last_fullname = CASE WHEN excluded.last_ts > last_ts THEN excluded.last_fullname ELSE last_fullname END, "
+    "last_ts = max(last_ts, excluded.last_ts)"
+)
+sqlite_conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+set_sqlite_pragmas(sqlite_conn, None)
+atexit.register(sqlite_conn.close)
+
+# HTTP settings of the aiohttp session shared by all subreddits (created in process_all, inside the event loop).
+# The pooled keep-alive connections avoid a new TCP + TLS handshake per request
+HTTP_HEADERS = {'User-agent': 'Mozilla/5.0'}
+HTTP_CONNECTION_LIMIT = 16
+HTTP_DNS_CACHE_TTL = 300  # Seconds
+HTTP_TIMEOUT = 10  # Seconds per request
+
+# Errors raised by aiohttp for network-related failures (connection errors, timeouts, HTTP errors)
+REQUEST_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+
+# Database calls run in worker threads; serialize writes so they don't contend for the SQLite write lock
+db_write_lock = threading.Lock()
+
+# AIMD concurrency control of the requests sent to Reddit by all the subreddit tasks
+CONCURRENCY_MIN = 1  # Lower bound of the decreases
+CONCURRENCY_MAX = 8
+CONCURRENCY_INCREASE = 1  # Additive increase (whole permits) after a healthy window
+CONCURRENCY_DECREASE = 0.5  # Multiplicative decrease on 429/5xx/connection errors
+LATENCY_TARGET = 0.5  # Seconds
+LATENCY_WINDOW = 10  # Samples per adjustment
+
+class ConcurrencyController:
+    """
+    Limits how many requests are in flight at once, adjusting the limit AIMD style (like TCP congestion control).
+
+    The limit is a whole number of permits and starts at `initial` (process_all passes the number of
+    subreddits, so a run starts fully parallel). Every `window` successful requests, if the median latency is at most
+    `latency_target` and nothing was throttled, the limit grows by `increase` (up to `maximum`).
+    A 429, a 5xx or a connection error multiplies it by `decrease` right away (down to `minimum`),
+    once per congestion event: further failures are ignored until `window` requests have succeeded
+    since the last decrease, so one burst seen by every in-flight task only halves the limit once.
+
+    Example usage:
+        async with controller:
+            response = await session.get(url)
+        await controller.record_success(latency)
+    """
+
+    def __init__(self, initial=CONCURRENCY_MIN, minimum=CONCURRENCY_MIN, maximum=CONCURRENCY_MAX,
+                 increase=CONCURRENCY_INCREASE, decrease=CONCURRENCY_DECREASE,
+                 latency_target=LATENCY_TARGET, window=LATENCY_WINDOW):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_target = latency_target
+        self.window = window
+        self.limit = max(minimum, min(initial, maximum))
+        self.in_flight = 0
+        self.latencies = []
+        self.successes_since_decrease = window  # The first failure always decreases
+        self.condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        async with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+        return False
+
+    async def record_success(self, latency):
+        """Records the latency of a successful request and grows the limit after a healthy window."""
+        async with self.condition:
+            self.successes_since_decrease += 1
+            self.latencies.append(latency)
+            if len(self.latencies) < self.window:
+                return
+            if statistics.median(self.latencies) <= self.latency_target:
+                self.limit = min(self.limit + self.increase, self.maximum)
+                self.condition.notify_all()
+            self.latencies.clear()
+
+    async def record_failure(self):
+        """Shrinks the limit after a throttled or failed request, unless it was already shrunk for this burst."""
+        async with self.condition:
+            if self.successes_since_decrease < self.window:
+                return
+            self.limit = max(int(self.limit * self.decrease), self.minimum)
+            self.successes_since_decrease = 0
+            self.latencies.clear()
+
+# Start slowing down before Reddit's quota runs out: below this many requests or this share of the window
+RATE_LIMIT_MIN_REMAINING = 2
+RATE_LIMIT_MIN_RATIO = 0.1
+
+# Give up on a page after this many consecutive failed attempts
+MAX_RETRIES = 6
+
+class RetriesExhaustedError(Exception):
+    """Raised when a page still cannot be fetched after MAX_RETRIES retries."""
+
+# Client errors that retrying cannot fix (bad request, unauthorized, private or banned subreddit)
+NON_RETRYABLE_STATUSES = {400, 401, 403, 404}
+
+class SubredditUnavailableError(Exception):
+    """Raised when Reddit answers with a non-retryable client error (see NON_RETRYABLE_STATUSES)."""
+
+# Function to get the exponential backoff time
+def get_backoff_time(retry_count):
+    """
+    Computes the exponential backoff for a retry, randomized so concurrent workers don't retry in lockstep.
+
+    Args:
+        retry_count (int): The number of consecutive failed attempts.
+
+    Returns:
+        float: The number of seconds to wait, between 50% and 150% of min(2 ** retry_count, 60).
+    """
+    return min(2 ** retry_count, 60) * random.uniform(0.5, 1.5)
+
+# Function to sleep with jitter
+async def sleep_with_jitter(wait_time):
+    """
+    Sleeps for the given time plus up to 30% of random jitter.
+
+    The jitter keeps the subreddit tasks from all waking up and retrying at the same instant.
+
+    Args:
+        wait_time (float): The base number of seconds to wait.
+
+    Returns:
+        None
+    """
+    await asyncio.sleep(wait_time + random.uniform(0, wait_time * 0.3))
+
+# Function to get the wait time requested by a rate limited response
+def get_retry_after(response, default=60):
+    """
+    Reads how long to wait before retrying a rate limited response.
+
+    Args:
+        response (aiohttp.ClientResponse): The rate limited response.
+        default (float, optional): The wait time used when no header is usable. Defaults to 60.
+
+    Returns:
+        float: The number of seconds to wait. `Retry-After` (either a number of seconds or an
+            HTTP-date) takes precedence over `X-Ratelimit-Reset`.
+    """
+    retry_after = response.headers.get('Retry-After')
+    if retry_after:
+        try:
+            return max(float(retry_after), 0)
+        except ValueError:
+            pass
+        try:
+            retry_date = email.utils.parsedate_to_datetime(retry_after)
+            return max(retry_date.timestamp() - time.time(), 0)
+        except (TypeError, ValueError):
+            pass
+
+    try:
+        return float(response.headers['X-Ratelimit-Reset'])
+    except (KeyError, ValueError):
+        return default
+
+# Function to pace requests from the rate limit headers
+async def throttle_from_headers(response):
+    """
+    Spreads the remaining requests over the rest of the rate limit window when the quota runs low.
+
+    Reddit reports `X-Ratelimit-Remaining`, `X-Ratelimit-Used` and `X-Ratelimit-Reset` (seconds until
+    the window resets) on every response. Sleeping `reset / remaining` once the quota is nearly used
+    up avoids hitting a 429 at all, instead of reacting to it afterwards.
+
+    Args:
+        response (aiohttp.ClientResponse): The last successful response.
+
+    Returns:
+        float: The remaining requests reported by Reddit, or None if the headers are missing.
+    """
+    try:
+        remaining = float(response.headers['X-Ratelimit-Remaining'])
+        used = float(response.headers.get('X-Ratelimit-Used', 0))
+        reset = float(response.headers.get('X-Ratelimit-Reset', 60))
+    except (KeyError, ValueError):
+        return None
+
+    window = used + remaining
+    if remaining <= RATE_LIMIT_MIN_REMAINING or (window and remaining / window < RATE_LIMIT_MIN_RATIO):
+        wait_time = reset / max(remaining, 1)
+        log_and_print(f"Rate limit almost reached ({remaining} requests left). Waiting for {wait_time:.1f} seconds...")
+        await sleep_with_jitter(wait_time)
+    return remaining
+
+# Subreddits processed when none are given on the command line
+DEFAULT_SUBREDDITS = ['computerscience', 'pics', 'brazil']
+
+# Posts requested per listing page (Reddit's maximum)
+PAGE_SIZE = 100
+
+# Readable date format stored in the created_date column
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Function to convert Unix timestamps to the readable date format
+def format_dates(timestamps):
+    """
+    Converts a batch of Unix timestamps to the readable date format of the `created_date` column.
+
+    Args:
+        timestamps (Iterable[float]): The Unix timestamps (UTC) to convert.
+
+    Returns:
+        List[str]: The formatted dates, in the same order as the timestamps.
+    """
+    # time.strftime/gmtime format straight to a str without allocating a datetime per post
+    strftime, gmtime = time.strftime, time.gmtime
+    return [strftime(DATE_FORMAT, gmtime(timestamp)) for timestamp in timestamps]
+
 # Function to get subreddit posts paginated
 
-def get_subreddit_posts_paginated(subreddit, last_timestamp):
+async def get_subreddit_posts_paginated(session, concurrency, subreddit, before=None, since=None):
     """
-    Retrieves paginated posts from a specified subreddit.
+    Retrieves paginated posts from the `new` listing of a specified subreddit.
+
+    This is an async generator yielding one page at a time, so the caller can stop the
+    pagination (by no longer iterating) as soon as a page contains nothing new.
+
+    When `before` is given, only the posts newer than that post are requested, walking
+    towards the newest one, so a delta run usually takes a single request. If nothing is
+    returned for it (no new posts, or the post was removed) the listing is walked from the
+    newest post instead, until the caller stops or, when `since` is given, until a page
+    reaches posts that are not newer than `since`. A run without any new post therefore
+    always takes 2 requests, not 1 (only the second one is counted as a fetched page).
+
+    Each page tells whether it was walked newest first: the newest stored post can only be
+    moved past such a page once the whole walk has ended, or the older posts of a failed
+    walk would never be fetched again.
 
     Args:
+        session (aiohttp.ClientSession): The HTTP session shared by all subreddits.
+        concurrency (ConcurrencyController): The limit of in-flight requests shared by all subreddits.
         subreddit (str): The name of the subreddit.
-        last_timestamp (float): The timestamp of the last processed post.
+        before (str, optional): The fullname (t3_...) of the newest post already stored.
+        since (float, optional): The created_utc of the newest post already stored.
 
-    Returns:
-        List[Dict[str, Union[str, float]]]: A list of dictionaries representing the new posts.
-            Each dictionary contains the following keys:
+    Yields:
+        Tuple[List[Dict[str, Union[str, float]]], bool]: The posts of a page and whether the page was
+            walked newest first (with `after`). Each post dictionary contains the following keys:
                 - 'title' (str): The title of the post.
                 - 'author' (str): The author of the post.
                 - 'created_utc' (float): The creation timestamp of the post.
+                - 'name' (str): The fullname of the post.
 
     Raises:
-        requests.exceptions.RequestException: If there is a network-related error.
-        Exception: If there is an unexpected error.
+        RetriesExhaustedError: If a page still fails after MAX_RETRIES retries
+            (rate limiting, server or network-related errors).
+        SubredditUnavailableError: If the subreddit cannot be read (e.g. it is private or banned).
+        Exception: If a page cannot be handled for any other reason.
 
     """
-    url = f"https://www.reddit.com/r/{subreddit}.json"
-    headers = {'User-agent': 'Mozilla/5.0'}
+    url = f"https://www.reddit.com/r/{subreddit}/new.json"
     
     after = None
-    new_posts = []
     retry_count = 0  # For exponential backoff
 
-    while True:
-        try:
-            params = {'after': after} if after else {}
-            response = requests.get(url, headers=headers, params=params)
-
-            # Check for rate limiting
-            if response.status_code == 429:
-                # Get the wait time from headers, if available
-                reset_time = int(response.headers.get('X-Ratelimit-Reset', 60))  # Default to 60 seconds
-                log_and_print(f"Rate limit exceeded. Waiting for {reset_time} seconds...")
-                time.sleep(reset_time)
-                continue  # Retry after waiting
-
-            # Check for throttling or server overload (HTTP 5xx errors)
-            if response.status_code >= 500:
-                retry_count += 1
-                wait_time = min(2 ** retry_count, 60)  # Exponential backoff, max 60 seconds
-                log_and_print(f"Server error, retrying in {wait_time} seconds...")
-                time.sleep(wait_time)
-                continue  # Retry the request
-
-            # Reset retry count if a request succeeds
-            retry_count = 0
-            response.raise_for_status()  # Raise any other HTTP errors
-
-            # Parse the response data
-            data = response.json()['data']
-            posts = data['children']
-            after = data['after']  # Get the next page's after value
-
-            for post in posts:
-                created_utc = post['data']['created_utc']
-                if created_utc > last_timestamp:
-                    new_posts.append({
+    # Telemetry summarized once per subreddit instead of logged for every page
+    pages_fetched = 0
+    min_remaining = None
+
+    try:
+        while True:
+            try:
+                params = {'limit': PAGE_SIZE}
+                if before:
+                    params['before'] = before
+                elif after:
+                    params['after'] = after
+                async with concurrency:
+                    start = time.monotonic()
+                    try:
+                        async with session.get(url, params=params) as response:
+                            if response.status < 400:
+                                content = await response.read()
+                    except REQUEST_ERRORS:
+                        await concurrency.record_failure()
+                        raise
+                    latency = time.monotonic() - start
+
+                if response.status == 429 or response.status >= 500:
+                    await concurrency.record_failure()
+                elif response.status < 400:
+                    # Other client errors say nothing about congestion, so they neither grow nor shrink the limit
+                    await concurrency.record_success(latency)
+
+                # Check for rate limiting
+                if response.status == 429:
+                    retry_count += 1
+                    if retry_count > MAX_RETRIES:
+                        raise RetriesExhaustedError(f"Still rate limited on {subreddit} after {MAX_RETRIES} retries")
+                    # Get the wait time from headers, falling back to exponential backoff
+                    reset_time = get_retry_after(response, default=get_backoff_time(retry_count))
+                    log_and_print(f"Rate limit exceeded. Waiting for {reset_time:.1f} seconds...")
+                    await sleep_with_jitter(reset_time)
+                    continue  # Retry after waiting
+
+                # Check for throttling or server overload (HTTP 5xx errors)
+                if response.status >= 500:
+                    retry_count += 1
+                    if retry_count > MAX_RETRIES:
+                        raise RetriesExhaustedError(f"Server error {response.status} on {subreddit} after {MAX_RETRIES} retries")
+                    wait_time = get_backoff_time(retry_count)  # Jittered exponential backoff, max ~90 seconds
+                    log_and_print(f"Server error, retrying in {wait_time:.1f} seconds...")
+                    await asyncio.sleep(wait_time)
+                    continue  # Retry the request
+
+                # Fail right away on client errors that retrying cannot fix
+                if response.status in NON_RETRYABLE_STATUSES:
+                    raise SubredditUnavailableError(f"Subreddit {subreddit} is not available (HTTP {response.status})")
+
+                response.raise_for_status()  # Raise any other HTTP errors
+
+                # Reset retry count once the request succeeded
+                retry_count = 0
+
+                # Parse the response data
+                data = orjson.loads(content)['data']  # orjson parses several times faster than response.json()
+                posts = data['children']
+
+                if before:
+                    if not posts:
+                        # Nothing newer than `before` (or it was removed): check from the newest post instead,
+                        # still honouring the rate limit headers of this response
+                        remaining_requests = await throttle_from_headers(response)
+                        if remaining_requests is not None and (min_remaining is None or remaining_requests < min_remaining):
+                            min_remaining = remaining_requests
+                        before = None
+                        continue
+                    # Everything returned is newer than `before`; the next page starts above the newest of them
+                    before = posts[0]['data']['name']
+                    has_more = len(posts) == PAGE_SIZE
+                else:
+                    after = data['after']  # Get the next page's after value
+                    # The listing is newest first: once a page reaches stored posts, the next one holds only older posts
+                    has_more = bool(after) and not (since and posts and posts[-1]['data']['created_utc'] <= since)
+                pages_fetched += 1
+
+                #Monitor Rate Limit Headers (Proactive Approach), before handing the page over so the
+                #summary stays accurate when the caller stops iterating at this page
+                remaining_requests = await throttle_from_headers(response)
+                if remaining_requests is not None and (min_remaining is None or remaining_requests < min_remaining):
+                    min_remaining = remaining_requests
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"Finished handling page before: {before}, after: {after}, remaining requests: {remaining_requests}")
+
+                # Already stored posts are skipped by the database (INSERT OR IGNORE), no filtering here
+                yield [
+                    {
                         'title': post['data']['title'],
                         'author': post['data']['author'],
-                        'created_utc': created_utc
-                    })
-                else:
-                    # Stop if posts are older than the last processed timestamp
-                    return new_posts
-            
-            #Monitor Rate Limit Headers (Proactive Approach)
-            remaining_requests = int(response.headers.get('X-Ratelimit-Remaining', 1))
-            log_and_print(f"Remaining requests: {remaining_requests}")
-
-            if remaining_requests <= 0:
-                reset_time = int(response.headers.get('X-Ratelimit-Reset', 60))
-                print(f"Rate limit exceeded. Waiting for {reset_time} seconds...")
-                time.sleep(reset_time)
-
-            # Stop if there are no more pages
-            if not after:
-                break
-
-        except requests.exceptions.RequestException as e:
-            # Handle network-related errors (e.g., connection errors, timeouts)
-            log_and_print(f"Request error: {e}",'error')
-            retry_count += 1
-            wait_time = min(2 ** retry_count, 60)  # Exponential backoff
-            log_and_print(f"Retrying in {wait_time} seconds...")
-            time.sleep(wait_time)
-            continue  # Retry the request after the wait time
-
-        except Exception as e:
-            # Handle any other unforeseen errors
-            log_and_print(f"An unexpected error occurred: {e}",'error')
-            break
-
-        finally:
-            # This block will run whether or not an exception occurs
-            # Can be used to perform cleanup if needed
-            log_and_print(f"Finished handling page after: {after}")
-
-    return new_posts
+                        'created_utc': post['data']['created_utc'],
+                        'name': post['data']['name']
+                    }
+                    for post in posts
+                ], not before
+
+                # Stop if there are no more pages
+                if not has_more:
+                    break
+
+            except (RetriesExhaustedError, SubredditUnavailableError):
+                raise  # Let the caller know this subreddit could not be fetched
+
+            except REQUEST_ERRORS as e:
+                # Handle network-related errors (e.g., connection errors, timeouts)
+                log_and_print(f"Request error: {e}",'error')
+                retry_count += 1
+                if retry_count > MAX_RETRIES:
+                    raise RetriesExhaustedError(f"Request to {subreddit} still failing after {MAX_RETRIES} retries: {e}") from e
+                wait_time = get_backoff_time(retry_count)  # Jittered exponential backoff
+                log_and_print(f"Retrying in {wait_time:.1f} seconds...")
+                await asyncio.sleep(wait_time)
+                continue  # Retry the request after the wait time
+
+            except Exception as e:
+                # Handle any other unforeseen errors; re-raised so a broken walk is never taken for a finished one
+                log_and_print(f"An unexpected error occurred: {e}",'error')
+                raise
+    finally:
+        log_and_print(f"Fetched {pages_fetched} pages from {subreddit} (last before: {before}, last after: {after}, min remaining requests: {min_remaining})")
 
 # Function to get the last processed timestamp from the database
-def get_last_timestamp(subreddit):
+def get_last_post(subreddit):
     """
-    Retrieves the most recent created_utc value for a specified subreddit from the database.
+    Retrieves the newest stored post of a specified subreddit from the subreddit_state table.
 
     Args:
         subreddit (str): The name of the subreddit.
 
     Returns:
-        float: The most recent created_utc value for the specified subreddit. Returns 0 if there are no records.
+        Tuple[float, Optional[str]]: The created_utc value and the fullname of the newest post for the
+            specified subreddit. Returns (0, None) if there are no records.
 
     Raises:
-        Exception: If there is an error retrieving the last timestamp.
+        Exception: If there is an error retrieving the last post.
     """
     try:
         with engine.connect() as conn:
-            # Select the most recent created_utc for the specified subreddit
-            query = (
-                select(posts_table.c.created_utc)
-                .where(posts_table.c.subreddit == subreddit)
-                .order_by(posts_table.c.created_utc.desc())
-                .limit(1)
-            )
-            result = conn.execute(query).fetchone()
-            readable_time = datetime.utcfromtimestamp(result[0]).strftime('%Y-%m-%d %H:%M:%S')
-            
-
-            log_and_print(f"Last processed timestamp: {result[0]}, {readable_time}",'info')
-            return result[0] if result else 0
+            # Select the newest post for the specified subreddit (primary key lookup)
+            result = conn.execute(LAST_POST_STMT, {'subreddit': subreddit}).fetchone()
+            if result is None:
+                log_and_print(f"No posts stored yet for subreddit {subreddit}",'info')
+                return 0, None
+
+            last_timestamp, last_fullname = result
+            readable_time = format_dates([last_timestamp])[0]
+            log_and_print(f"Last processed timestamp: {last_timestamp}, {readable_time} ({last_fullname})",'info')
+            return last_timestamp, last_fullname
     except Exception as e:
-        log_and_print(f"Error getting last timestamp for subreddit {subreddit}: {e}. This happens while running the code for the first time as there's no data in the database.",'error')
-        return 0
+        log_and_print(f"Error getting last post for subreddit {subreddit}: {e}",'error')
+        return 0, None
 
 # Function to save new posts into the database
-def save_new_posts(new_posts, subreddit):
+def save_new_posts(new_posts, subreddit, update_state=True):
     """
-    Saves new posts to the database.
+    Saves new posts to the database. Posts that are already stored are ignored.
 
     Args:
         new_posts (List[Dict[str, Any]]): A list of dictionaries representing the new posts.
         subreddit (str): The subreddit to which the posts belong.
+        update_state (bool, optional): Whether to move the newest stored post of the subreddit
+            to the newest of these posts, in the same transaction. Defaults to True.
 
     Returns:
-        None
+        int: The number of posts actually inserted.
 
     Raises:
-        Exception: If there is an error saving the new posts.
+        Exception: If there is an error saving the new posts (it is logged and re-raised, so a
+            database failure is never mistaken for a page without new posts).
 
     """
     try:
-        with engine.connect() as conn:
-            for post in new_posts:
-                # Convert Unix timestamp to human-readable format
-                readable_time = datetime.utcfromtimestamp(post['created_utc']).strftime('%Y-%m-%d %H:%M:%S')
-            
+        # Convert Unix timestamps to human-readable format, once for the whole batch
+        readable_times = format_dates(post['created_utc'] for post in new_posts)
+
+        newest_post = max(new_posts, key=lambda post: post['created_utc'], default=None)
+
+        # Build all rows up front so they can be sent in as few statements as possible
+        rows = [
+            (
+                subreddit,
+                post['title'],
+                post['author'],
+                post['created_utc'],
+                readable_time
+            )
+            for post, readable_time in zip(new_posts, readable_times)
+        ]
+
+        # One explicit transaction around all the chunks (one commit instead of one per post)
+        with db_write_lock:
+            sqlite_conn.execute("BEGIN")
+            try:
+                inserted = 0
+                for start in range(0, len(rows), ROWS_PER_STMT):
+                    chunk = rows[start:start + ROWS_PER_STMT]
+                    # Full chunks reuse the same prepared statement; only the last partial one differs
+                    sql = INSERT_POST_CHUNK_SQL if len(chunk) == ROWS_PER_STMT else build_insert_sql(len(chunk))
+                    inserted += sqlite_conn.execute(sql, [value for row in chunk for value in row]).rowcount
+                if update_state and newest_post:
+                    # Keep the newest post in the same transaction as the posts
+                    sqlite_conn.execute(UPDATE_STATE_SQL, (subreddit, newest_post['created_utc'], newest_post['name']))
+                sqlite_conn.execute("COMMIT")
+            except Exception:
+                sqlite_conn.execute("ROLLBACK")
+                raise
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Inserted {inserted} posts into the database")
+        return inserted
+    except Exception as e:
+        log_and_print(f"Error saving new posts for subreddit {subreddit}: {e}",'error')
+        raise
+
+# Function to save the newest stored post of a subreddit
+def save_subreddit_state(subreddit, newest_post):
+    """
+    Moves the newest stored post of a subreddit forward (it never moves back).
+
+    Args:
+        subreddit (str): The name of the subreddit.
+        newest_post (Dict[str, Any]): The newest post saved for the subreddit.
+
+    Returns:
+        None
+
+    Raises:
+        Exception: If there is an error saving the state (it is logged and re-raised).
 
-                insert_query = posts_table.insert().values(
-                    subreddit=subreddit,
-                    title=post['title'],
-                    author=post['author'],
-                    created_utc=post['created_utc'],
-                    created_date=readable_time
-                )
-                conn.execute(insert_query)
-            conn.commit()  # Ensure transaction is committed
-            log_and_print(f"Inserted {len(new_posts)} posts into the database")  # Debug print
+    """
+    try:
+        with db_write_lock:
+            sqlite_conn.execute(UPDATE_STATE_SQL, (subreddit, newest_post['created_utc'], newest_post['name']))
     except Exception as e:
-        log_and_print(f"Error saving new posts for subreddit {subreddit}: {e}")
+        log_and_print(f"Error saving the state of subreddit {subreddit}: {e}",'error')
+        raise
+
+# Function to process a single subreddit
+async def process_one(session, concurrency, subreddit):
+    """
+    Fetches and saves the new posts of a single subreddit.
+
+    The blocking database calls run in a worker thread so they don't stall the other subreddits.
+
+    Args:
+        session (aiohttp.ClientSession): The HTTP session shared by all subreddits.
+        concurrency (ConcurrencyController): The limit of in-flight requests shared by all subreddits.
+        subreddit (str): The name of the subreddit.
+
+    Returns:
+        None
+
+    Raises:
+        Exception: If there is an error processing the subreddit.
+    """
+    log_and_print(f"Processing subreddit: {subreddit}")
+
+    last_timestamp, last_fullname = await asyncio.to_thread(get_last_post, subreddit)
+
+    total_inserted = 0
+    newest_post = None
+    pages = get_subreddit_posts_paginated(session, concurrency, subreddit, before=last_fullname, since=last_timestamp)
+    try:
+        async for page_posts, newest_first in pages:
+            # Save each page as it arrives. Oldest-first pages move the newest stored post with them;
+            # newest-first ones only once the walk ended, so a failed page is fetched again next run
+            inserted = await asyncio.to_thread(save_new_posts, page_posts, subreddit, update_state=not newest_first)
+            if newest_first and page_posts:
+                page_newest = max(page_posts, key=lambda post: post['created_utc'])
+                if newest_post is None or page_newest['created_utc'] > newest_post['created_utc']:
+                    newest_post = page_newest
+            # A page without a single new post only means we caught up when walking oldest first: newest
+            # first, it may just be the part an interrupted run already saved, so the paginator's stop
+            # at the newest stored post (`since`) decides instead
+            if not inserted and not newest_first:
+                break
+            total_inserted += inserted
+    finally:
+        await pages.aclose()  # Stop the paginator from fetching any further page
+
+    if newest_post:
+        await asyncio.to_thread(save_subreddit_state, subreddit, newest_post)
+
+    if total_inserted:
+        log_and_print(f"Found {total_inserted} new posts in {subreddit}")
+    else:
+        log_and_print(f"No new posts in {subreddit}")
+
+# Function to process all the subreddits concurrently
+async def process_all(subreddits):
+    """
+    Processes every subreddit concurrently on a single event loop, sharing one HTTP session
+    and one concurrency controller (both are bound to the running event loop, so they are
+    created here for every run).
+
+    Parameters:
+    - subreddits (List[str]): The subreddits to process.
+
+    Returns:
+    - None
+    """
+    connector = aiohttp.TCPConnector(limit=HTTP_CONNECTION_LIMIT, ttl_dns_cache=HTTP_DNS_CACHE_TTL)
+    timeout = aiohttp.ClientTimeout(total=HTTP_TIMEOUT)
+    concurrency = ConcurrencyController(initial=len(subreddits))
+    async with aiohttp.ClientSession(connector=connector, headers=HTTP_HEADERS, timeout=timeout) as session:
+        results = await asyncio.gather(
+            *(process_one(session, concurrency, subreddit) for subreddit in subreddits),
+            return_exceptions=True
+        )
+
+    for subreddit, result in zip(subreddits, results):
+        if isinstance(result, Exception):
+            log_and_print(f"Error processing subreddit {subreddit}: {result}")
 
 # Main function
 def main(subreddits):
     """
     Runs the main function that processes and saves new posts from multiple subreddits.
 
-    This function iterates over a list of subreddits, retrieves the last processed timestamp
-    for each subreddit using the `get_last_timestamp` function, and then retrieves new posts
-    from the subreddit using the `get_subreddit_posts_paginated` function. If new posts are
-    found, they are processed and saved to the database using the `save_new_posts` function.
-    The last processed timestamp is also updated with the latest post time.
+    This function runs `process_all`, where a `process_one` task per subreddit looks up the
+    newest stored post using the `get_last_post` function, retrieves the newer pages of the
+    subreddit using the `get_subreddit_posts_paginated` function and saves each of them to
+    the database using the `save_new_posts` function, which skips the posts that are already
+    stored. Pagination stops at the first page without new posts. The subreddits are fetched
+    concurrently with asyncio since most of the time is spent waiting on the network.
 
     Parameters:
-    - None
+    - subreddits (List[str]): The subreddits to process.
 
     Returns:
     - None
@@ -243,30 +757,11 @@ def main(subreddits):
     """
     #subreddits = ['computerscience', 'pics', 'brazil']
 
-    for subreddit in subreddits:
-        try:
-            log_and_print(f"Processing subreddit: {subreddit}")
-            
-            last_timestamp = get_last_timestamp(subreddit)
-            #log_and_print(f"Last processed timestamp: {last_timestamp}")
-
-            new_posts = get_subreddit_posts_paginated(subreddit, last_timestamp)
-            log_and_print(f"Found {len(new_posts)} new posts in {subreddit}")
-            
-            # Process and save new posts
-            if new_posts:
-                log_and_print(f"saving new posts for subreddit: {subreddit}")
-                save_new_posts(new_posts, subreddit)
-                
-            else:
-                log_and_print(f"No new posts in {subreddit}")
-                
-        except Exception as e:
-            log_and_print(f"Error processing subreddit {subreddit}: {e}")
+    asyncio.run(process_all(subreddits))
 
     log_and_print("Finished processing all subreddits")
             
 if __name__ == "__main__":
     # Get subreddit list from command-line arguments
-    subreddits = sys.argv[1].split(',') if len(sys.argv) > 1 else ['computerscience', 'pics', 'brazil']
+    subreddits = sys.argv[1].split(',') if len(sys.argv) > 1 else DEFAULT_SUBREDDITS
     main(subreddits)
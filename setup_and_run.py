@@ -4,6 +4,7 @@ import sys
 from logger_setup import setup_logging, log_and_print
 
 #Run this script if not using docker. This script creates the environment and then calls the main.py function.
+#If it is already running inside a virtual environment, main is called in-process instead of starting a new interpreter.
 
 # Set up logging
 setup_logging()
@@ -14,35 +15,60 @@ env_name = 'env'
 requirements_file = 'requirements.txt'
 main_script = 'main.py'
 
+# Function to check if the current interpreter runs inside a virtual environment
+def in_virtual_env():
+    return sys.prefix != sys.base_prefix
+
 # Function to check if the virtual environment already exists
 def check_env_exists(env_name):
     return os.path.exists(env_name)
 
+# Function to get the python executable of the virtual environment (Scripts on Windows, bin elsewhere)
+def get_env_python(env_name):
+    if os.name == 'nt':
+        return os.path.join(env_name, 'Scripts', 'python')
+    return os.path.join(env_name, 'bin', 'python')
+
 # Function to create a virtual environment
 def create_virtual_env(env_name):
-    print(f"Creating virtual environment: {env_name}...")
+    log_and_print(f"Creating virtual environment: {env_name}...")
     subprocess.check_call([sys.executable, '-m', 'venv', env_name])
-    print("Virtual environment created successfully.")
+    log_and_print("Virtual environment created successfully.")
 
 # Function to install dependencies from requirements.txt
-def install_requirements(env_name):
-    print("Installing dependencies from requirements.txt...")
-    subprocess.check_call([os.path.join(env_name, 'Scripts', 'pip'), 'install', '-r', requirements_file])
-    print("Dependencies installed successfully.")
+def install_requirements(python_executable):
+    log_and_print("Installing dependencies from requirements.txt...")
+    subprocess.check_call([python_executable, '-m', 'pip', 'install', '-r', requirements_file])
+    log_and_print("Dependencies installed successfully.")
 
 # Function to run the main.py script
 def run_main_script(env_name):
-    print(f"Running {main_script}...")
-    subprocess.check_call([os.path.join(env_name, 'Scripts', 'python'), main_script])
+    log_and_print(f"Running {main_script}...")
+    subprocess.check_call([get_env_python(env_name), main_script] + sys.argv[1:])
+
+# Function to run main in the current interpreter, skipping the start up of a new one
+def run_main_in_process():
+    log_and_print(f"Running {main_script} in-process...")
+    from main import main as run_main, DEFAULT_SUBREDDITS
+    run_main(sys.argv[1].split(',') if len(sys.argv) > 1 else DEFAULT_SUBREDDITS)
+
+if in_virtual_env():
+    log_and_print("Already running inside a virtual environment.")
+
+    # Install requirements
+    install_requirements(sys.executable)
 
-# Check if the virtual environment exists
-log_and_print("Checking if virtual environment exists...")
-if not check_env_exists(env_name):
-    log_and_print("Virtual environment does not exist. Creating it now...")
-    create_virtual_env(env_name)
+    # Run the main script
+    run_main_in_process()
+else:
+    # Check if the virtual environment exists
+    log_and_print("Checking if virtual environment exists...")
+    if not check_env_exists(env_name):
+        log_and_print("Virtual environment does not exist. Creating it now...")
+        create_virtual_env(env_name)
 
-# Install requirements
-install_requirements(env_name)
+    # Install requirements
+    install_requirements(get_env_python(env_name))
 
-# Run the main script
-run_main_script(env_name)
+    # Run the main script
+    run_main_script(env_name)